@@ -11,6 +11,54 @@ COMPOSIO_BASE_URL = os.getenv('COMPOSIO_BASE_URL', 'https://api.composio.dev')
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Groq Configuration
+GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
+GROQ_FAST_MODEL = os.getenv('GROQ_FAST_MODEL', 'llama-3.1-8b-instant')
+
+# Model Routing Configuration
+# Each agent gets a primary model and an ordered list of fallbacks that are
+# tried on timeout or rate limiting (HTTP 429). max_tokens is the upper bound;
+# the router lowers it once it has seen enough outputs for that agent's task.
+MODEL_ROUTING = {
+    'scraper': {
+        'model': GROQ_FAST_MODEL,
+        'fallbacks': [GROQ_MODEL],
+        'temperature': 0.3,
+        'max_tokens': 2048,
+        'latency_budget': 10.0
+    },
+    'researcher': {
+        'model': GROQ_MODEL,
+        'fallbacks': [GROQ_FAST_MODEL],
+        'temperature': 0.5,
+        'max_tokens': 4096,
+        'latency_budget': 30.0
+    },
+    'analyst': {
+        'model': GROQ_MODEL,
+        'fallbacks': [GROQ_FAST_MODEL],
+        'temperature': 0.7,
+        'max_tokens': 4096,
+        'latency_budget': 30.0
+    }
+}
+
+# Price per million tokens, used to report the cost of each run
+MODEL_PRICING = {
+    'llama-3.3-70b-versatile': {'input': 0.59, 'output': 0.79},
+    'llama-3.1-8b-instant': {'input': 0.05, 'output': 0.08}
+}
+
+ROUTING_SETTINGS = {
+    'min_samples': 3,         # outputs observed before max_tokens adapts
+    'headroom': 1.25,         # multiplier over the longest observed output
+    'min_tokens': 256,        # never adapt max_tokens below this
+    'cooldown_seconds': 60,   # how long a timed out or rate-limited model is skipped
+    'latency_alpha': 0.3,     # smoothing factor for latency moving average
+    'state_file': 'model_routing_state.json'  # stats kept between runs
+}
+
 # Agent Configuration
 AGENT_CONFIG = {
     'researcher': {
@@ -1,6 +1,7 @@
-from crewai import Agent, Task, Crew, Process
-from config.config import AGENT_CONFIG, GROQ_API_KEY, GROQ_MODEL
+from crewai import Agent, Task, Crew, Process, BaseLLM
+from config.config import AGENT_CONFIG, GROQ_API_KEY, ROUTING_SETTINGS
 from src.composio_api import ComposioAPI
+from src.model_router import ModelRouter
 from utils.helpers import format_mcp_data, save_results
 from utils.search_api import google_search
 from utils.scraper import run_scraper
@@ -9,10 +10,48 @@ import groq
 
 logger = logging.getLogger(__name__)
 
+class RoutedGroqLLM(BaseLLM):
+    """CrewAI LLM that sends every call for an agent through the model router"""
+
+    def __init__(self, client, router, agent_key):
+        route = router.routing[agent_key]
+        super().__init__(model=route['model'], temperature=route.get('temperature'))
+        self.client = client
+        self.router = router
+        self.agent_key = agent_key
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        """Run one chat completion, returning the message text"""
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        # Groq accepts at most 4 stop sequences
+        stop = list(getattr(self, 'stop', None) or [])[:4]
+        response = self.router.complete(
+            self.agent_key,
+            self.client.chat.completions.create,
+            messages=messages,
+            stop=stop or None
+        )
+        return response.choices[0].message.content
+
+    def supports_function_calling(self):
+        """Tools are driven through the ReAct text prompt"""
+        return False
+
+    def supports_stop_words(self):
+        """Stop words are passed through to Groq"""
+        return True
+
+    def get_context_window_size(self):
+        """Context window of the Groq Llama 3.x models"""
+        return 131072
+
 class CrewAgents:
-    def __init__(self):
+    def __init__(self, router=None):
         self.composio = ComposioAPI()
         self.groq_client = groq.Client(api_key=GROQ_API_KEY)
+        self.router = router or ModelRouter()
+        self.router.load_state(ROUTING_SETTINGS['state_file'])
         self.agents = self._create_agents()
         self.tasks = self._create_tasks()
         self.crew = self._create_crew()
@@ -27,7 +66,7 @@ class CrewAgents:
             goal="Gather comprehensive information about steel industry, market trends, and company activities",
             backstory="Expert at collecting and analyzing steel industry data with deep knowledge of JSW Steel and competitors",
             verbose=True,
-            llm=self._create_groq_llm(),
+            llm=self._create_groq_llm('scraper'),
             tools=[google_search, run_scraper]
         )
         
@@ -37,7 +76,7 @@ class CrewAgents:
             goal="Analyze steel production data, market trends, and competitive landscape",
             backstory="Experienced steel industry analyst with expertise in production metrics and market dynamics",
             verbose=True,
-            llm=self._create_groq_llm()
+            llm=self._create_groq_llm('researcher')
         )
         
         # Create Analyst agent
@@ -46,19 +85,14 @@ class CrewAgents:
             goal="Generate actionable insights and strategic recommendations for steel industry operations",
             backstory="Strategic advisor with deep understanding of steel manufacturing and market positioning",
             verbose=True,
-            llm=self._create_groq_llm()
+            llm=self._create_groq_llm('analyst')
         )
         
         return agents
 
-    def _create_groq_llm(self):
-        """Create Groq LLM configuration"""
-        return {
-            "model": GROQ_MODEL,
-            "api_key": GROQ_API_KEY,
-            "temperature": 0.7,
-            "max_tokens": 4096
-        }
+    def _create_groq_llm(self, agent_key):
+        """Create a Groq LLM whose calls are routed per agent"""
+        return RoutedGroqLLM(self.groq_client, self.router, agent_key)
 
     def _create_tasks(self):
         """Create tasks for the agents"""
@@ -144,8 +178,12 @@ class CrewAgents:
                 }
             }
             
-            # Run the crew with context
+            # Run the crew with context; each LLM call picks its model and
+            # falls back through the router
+            self.router.start_run()
+            start_time = self.router.clock()
             result = self.crew.kickoff(context=context)
+            duration = self.router.clock() - start_time
             
             # Process and save results
             final_results = {
@@ -156,8 +194,10 @@ class CrewAgents:
                     'project': project,
                     'timestamp': formatted_mcp_data.get('timestamp'),
                     'industry': 'Steel Manufacturing',
-                    'analysis_focus': 'Production and Market Analysis'
-                }
+                    'analysis_focus': 'Production and Market Analysis',
+                    'duration_seconds': duration
+                },
+                'model_routing': self.router.get_stats()
             }
             
             # Save results
@@ -166,4 +206,6 @@ class CrewAgents:
             return final_results
         except Exception as e:
             logger.error(f"Error running crew: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+        finally:
+            self.router.save_state(ROUTING_SETTINGS['state_file']) 
\ No newline at end of file
@@ -0,0 +1,325 @@
+from config.config import MODEL_ROUTING, MODEL_PRICING, ROUTING_SETTINGS
+import json
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error):
+    """
+    Check whether an LLM error is caused by rate limiting
+
+    Args:
+        error (Exception): Error raised by the LLM client
+
+    Returns:
+        bool: True for HTTP 429 responses
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status_code == 429 or 'RateLimit' in type(error).__name__
+
+
+def is_retryable_error(error):
+    """
+    Check whether an LLM error should trigger a fallback model
+
+    Args:
+        error (Exception): Error raised by the LLM client
+
+    Returns:
+        bool: True for timeouts and rate limiting (HTTP 429)
+    """
+    if isinstance(error, TimeoutError) or is_rate_limit_error(error):
+        return True
+    return 'Timeout' in type(error).__name__
+
+
+class ModelRouter:
+    """Route each agent's LLM calls to a model, fall back on failures and track usage"""
+
+    def __init__(self, routing=None, settings=None, pricing=None, clock=time.monotonic):
+        self.routing = routing or MODEL_ROUTING
+        self.settings = dict(ROUTING_SETTINGS, **(settings or {}))
+        self.pricing = MODEL_PRICING if pricing is None else pricing
+        self.clock = clock
+        # Learned state, kept between runs by save_state/load_state
+        self.output_tokens = {}
+        self.latency = {}
+        # Per-run counters, reset by start_run
+        self.model_stats = {}
+        self.decisions = []
+        self.cooldowns = {}
+        self._lock = threading.Lock()
+
+    def _route(self, agent_key):
+        if agent_key not in self.routing:
+            raise KeyError(f"No model routing configured for agent '{agent_key}'")
+        return self.routing[agent_key]
+
+    def _stats_for(self, model):
+        return self.model_stats.setdefault(model, {
+            'calls': 0,
+            'failures': 0,
+            'fallbacks': 0,
+            'total_latency': 0.0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'cost': 0.0
+        })
+
+    def _record_decision(self, agent_key, model, reason):
+        self.decisions.append({
+            'agent': agent_key,
+            'model': model,
+            'reason': reason,
+            'timestamp': time.time()
+        })
+
+    def start_run(self):
+        """Reset the per-run counters and decisions, keeping learned state"""
+        with self._lock:
+            self.model_stats = {}
+            self.decisions = []
+
+    def candidates(self, agent_key):
+        """
+        Get the models to try for an agent, in order
+
+        Models on cooldown after a timeout or rate limit are moved to the
+        back, and a model whose average call latency for this agent exceeds
+        the agent's budget is moved behind faster fallbacks.
+
+        Args:
+            agent_key (str): Agent identifier from MODEL_ROUTING
+
+        Returns:
+            list: Model names in the order they should be tried
+        """
+        route = self._route(agent_key)
+        models = [route['model']] + [m for m in route.get('fallbacks', []) if m != route['model']]
+        budget = route.get('latency_budget')
+        now = self.clock()
+
+        with self._lock:
+            latency = self.latency.get(agent_key, {})
+
+            def rank(item):
+                position, model = item
+                cooling = self.cooldowns.get(model, 0) > now
+                avg_latency = latency.get(model)
+                too_slow = budget is not None and avg_latency is not None and avg_latency > budget
+                return (cooling, too_slow, position)
+
+            return [model for _, model in sorted(enumerate(models), key=rank)]
+
+    def max_tokens(self, agent_key):
+        """
+        Get the max_tokens limit for an agent's LLM calls
+
+        Args:
+            agent_key (str): Agent identifier from MODEL_ROUTING
+
+        Returns:
+            int: Configured limit, or a tighter one derived from observed calls
+        """
+        self._route(agent_key)
+        with self._lock:
+            return self._max_tokens(agent_key)
+
+    def _max_tokens(self, agent_key):
+        cap = self.routing[agent_key].get('max_tokens', 4096)
+        observed = self.output_tokens.get(agent_key, [])
+        if len(observed) < self.settings['min_samples']:
+            return cap
+        adapted = math.ceil(max(observed) * self.settings['headroom'] / 64) * 64
+        return max(self.settings['min_tokens'], min(cap, adapted))
+
+    def record_output(self, agent_key, tokens, truncated=False):
+        """
+        Record the completion tokens of one LLM call made for an agent
+
+        A truncated call says nothing about how long the output should have
+        been, so it discards the observations and restores the configured limit.
+
+        Args:
+            agent_key (str): Agent identifier from MODEL_ROUTING
+            tokens (int): Completion tokens reported by the API
+            truncated (bool): Whether the call stopped at max_tokens
+        """
+        with self._lock:
+            if truncated:
+                self.output_tokens.pop(agent_key, None)
+                return
+            if not tokens:
+                return
+            observed = self.output_tokens.setdefault(agent_key, [])
+            observed.append(int(tokens))
+            del observed[:-50]
+
+    def record_success(self, agent_key, model, latency, prompt_tokens=0, completion_tokens=0):
+        """
+        Record a successful call to a model
+
+        Args:
+            agent_key (str): Agent identifier from MODEL_ROUTING
+            model (str): Model name
+            latency (float): Call duration in seconds
+            prompt_tokens (int): Tokens sent to the model
+            completion_tokens (int): Tokens produced by the model
+        """
+        alpha = self.settings['latency_alpha']
+        with self._lock:
+            stats = self._stats_for(model)
+            stats['calls'] += 1
+            stats['total_latency'] += latency
+            stats['prompt_tokens'] += prompt_tokens or 0
+            stats['completion_tokens'] += completion_tokens or 0
+            stats['cost'] += self._cost(model, prompt_tokens or 0, completion_tokens or 0)
+
+            latencies = self.latency.setdefault(agent_key, {})
+            previous = latencies.get(model)
+            latencies[model] = latency if previous is None else alpha * latency + (1 - alpha) * previous
+
+    def record_failure(self, model, error):
+        """
+        Record a failed call to a model
+
+        Args:
+            model (str): Model name
+            error (Exception): Error raised by the LLM client
+        """
+        with self._lock:
+            self._stats_for(model)['failures'] += 1
+            if is_retryable_error(error):
+                self.cooldowns[model] = self.clock() + self.settings['cooldown_seconds']
+
+    def complete(self, agent_key, call, **kwargs):
+        """
+        Run an LLM call for an agent, falling back on timeout or rate limiting
+
+        Args:
+            agent_key (str): Agent identifier from MODEL_ROUTING
+            call (callable): Function accepting model, temperature, max_tokens
+                and any extra keyword arguments, returning the LLM response
+            **kwargs: Extra arguments passed through to call
+
+        Returns:
+            Response returned by call
+        """
+        route = self._route(agent_key)
+        last_error = None
+
+        for attempt, model in enumerate(self.candidates(agent_key)):
+            start = self.clock()
+            try:
+                response = call(
+                    model=model,
+                    temperature=route.get('temperature', 0.7),
+                    max_tokens=self.max_tokens(agent_key),
+                    **kwargs
+                )
+            except Exception as e:
+                self.record_failure(model, e)
+                if not is_retryable_error(e):
+                    raise
+                logger.warning(f"Model {model} failed for {agent_key}, trying fallback: {str(e)}")
+                last_error = e
+                continue
+
+            prompt_tokens, completion_tokens = self._usage(response)
+            self.record_success(agent_key, model, self.clock() - start, prompt_tokens, completion_tokens)
+            self.record_output(agent_key, completion_tokens, truncated=self._truncated(response))
+            if attempt:
+                reason = 'fallback'
+            elif model != route['model']:
+                reason = 'rerouted'
+            else:
+                reason = 'primary'
+            with self._lock:
+                if attempt:
+                    self._stats_for(model)['fallbacks'] += 1
+                self._record_decision(agent_key, model, reason)
+            return response
+
+        logger.error(f"All models failed for {agent_key}")
+        raise last_error
+
+    def _cost(self, model, prompt_tokens, completion_tokens):
+        price = self.pricing.get(model)
+        if not price:
+            return 0.0
+        return (prompt_tokens * price.get('input', 0) + completion_tokens * price.get('output', 0)) / 1e6
+
+    def _usage(self, response):
+        usage = response.get('usage') if isinstance(response, dict) else getattr(response, 'usage', None)
+        if usage is None:
+            return 0, 0
+        if isinstance(usage, dict):
+            return usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0)
+        return getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0)
+
+    def _truncated(self, response):
+        choices = response.get('choices') if isinstance(response, dict) else getattr(response, 'choices', None)
+        if not choices:
+            return False
+        choice = choices[0]
+        finish_reason = choice.get('finish_reason') if isinstance(choice, dict) else getattr(choice, 'finish_reason', None)
+        return finish_reason == 'length'
+
+    def get_stats(self):
+        """
+        Get this run's routing decisions and per-model latency/token/cost stats
+
+        Returns:
+            dict: Snapshot suitable for saving alongside analysis results
+        """
+        with self._lock:
+            return {
+                'models': {model: dict(stats) for model, stats in self.model_stats.items()},
+                'total_cost': sum(stats['cost'] for stats in self.model_stats.values()),
+                'max_tokens': {agent: self._max_tokens(agent) for agent in self.routing},
+                'decisions': list(self.decisions)
+            }
+
+    def load_state(self, filename):
+        """
+        Load output lengths and call latencies learned by earlier runs
+
+        Args:
+            filename (str): State file written by save_state
+        """
+        try:
+            with open(filename, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Error loading model routing state: {str(e)}")
+            return
+
+        with self._lock:
+            self.output_tokens = state.get('output_tokens', {})
+            self.latency = state.get('latency', {})
+
+    def save_state(self, filename):
+        """
+        Save learned output lengths and call latencies for later runs
+
+        Args:
+            filename (str): Output filename
+        """
+        with self._lock:
+            state = {
+                'output_tokens': self.output_tokens,
+                'latency': self.latency
+            }
+            try:
+                with open(filename, 'w') as f:
+                    json.dump(state, f, indent=2)
+            except Exception as e:
+                logger.error(f"Error saving model routing state: {str(e)}")
@@ -0,0 +1,172 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from config.config import GROQ_MODEL, GROQ_FAST_MODEL, MODEL_ROUTING
+from src.model_router import ModelRouter
+
+# utils.search_api and utils.scraper are not part of this tree
+with patch.dict(sys.modules, {'utils.search_api': MagicMock(), 'utils.scraper': MagicMock()}):
+    from src.crew_agents import CrewAgents
+
+PRICING = {
+    GROQ_MODEL: {'input': 0.59, 'output': 0.79},
+    GROQ_FAST_MODEL: {'input': 0.05, 'output': 0.08}
+}
+
+SINGLE_MODEL_ROUTING = {
+    agent: dict(route, model=GROQ_MODEL, fallbacks=[])
+    for agent, route in MODEL_ROUTING.items()
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeGroq:
+    """Local stand-in for the Groq client with per-model latency"""
+
+    LATENCY = {GROQ_MODEL: 2.0, GROQ_FAST_MODEL: 0.5}
+
+    def __init__(self, clock, rate_limited=None):
+        self.clock = clock
+        self.rate_limited = rate_limited or {}
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, temperature, max_tokens, messages, stop=None):
+        self.calls.append({'model': model, 'max_tokens': max_tokens, 'messages': messages})
+        if self.rate_limited.get(model):
+            self.rate_limited[model] -= 1
+            raise RateLimitError('rate limited')
+        self.clock.now += self.LATENCY[model]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='x' * 1200), finish_reason='stop')],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=300)
+        )
+
+
+class FakeAgent:
+    def __init__(self, role, llm, **kwargs):
+        self.role = role
+        self.llm = llm
+
+
+class FakeTask:
+    def __init__(self, description, agent):
+        self.description = description
+        self.agent = agent
+
+
+class FakeCrew:
+    """Stand-in for crewai.Crew making two LLM calls per task, in order"""
+
+    def __init__(self, agents, tasks, verbose, process):
+        self.tasks = tasks
+
+    def kickoff(self, context):
+        output = None
+        for task in self.tasks:
+            for _ in range(2):
+                output = task.agent.llm.call(task.description)
+        return output
+
+
+class TestCrewAgents(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.groq = FakeGroq(self.clock)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmp.name, 'state.json')
+
+        composio = MagicMock()
+        composio.get_mcp_data.return_value = {'timestamp': 0, 'metrics': {}, 'status': 'ok'}
+        groq = MagicMock()
+        groq.Client.side_effect = lambda api_key: self.groq
+        patchers = [
+            patch('src.crew_agents.Agent', FakeAgent),
+            patch('src.crew_agents.Task', FakeTask),
+            patch('src.crew_agents.Crew', FakeCrew),
+            patch('src.crew_agents.ComposioAPI', return_value=composio),
+            patch('src.crew_agents.groq', groq),
+            patch('src.crew_agents.save_results'),
+            patch.dict('src.crew_agents.ROUTING_SETTINGS', {'state_file': self.state_file})
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def run_crew(self, routing=None):
+        router = ModelRouter(routing=routing, pricing=PRICING, clock=self.clock)
+        return CrewAgents(router=router).run_crew()
+
+    def test_run_crew_records_per_model_stats(self):
+        result = self.run_crew()
+
+        models = result['model_routing']['models']
+        self.assertEqual(models[GROQ_FAST_MODEL]['calls'], 2)
+        self.assertEqual(models[GROQ_MODEL]['calls'], 4)
+        self.assertEqual(models[GROQ_MODEL]['prompt_tokens'], 4000)
+        self.assertEqual(models[GROQ_MODEL]['total_latency'], 8.0)
+        self.assertGreater(result['model_routing']['total_cost'], 0)
+        self.assertEqual(len(result['model_routing']['decisions']), 6)
+
+        with open(self.state_file) as f:
+            state = json.load(f)
+        self.assertEqual(set(state), {'output_tokens', 'latency'})
+        self.assertEqual(state['latency']['scraper'], {GROQ_FAST_MODEL: 0.5})
+
+    def test_stats_are_reported_per_run(self):
+        self.run_crew()
+        result = self.run_crew()
+
+        self.assertEqual(result['model_routing']['models'][GROQ_MODEL]['calls'], 4)
+
+    def test_learned_max_tokens_used_by_next_run(self):
+        self.run_crew()
+        self.run_crew()
+        self.groq.calls = []
+
+        self.run_crew()
+
+        self.assertEqual({call['max_tokens'] for call in self.groq.calls}, {384})
+
+    def test_rate_limit_falls_back_per_call(self):
+        self.groq.rate_limited = {GROQ_MODEL: 1}
+
+        result = self.run_crew()
+
+        stats = result['model_routing']
+        self.assertEqual(stats['models'][GROQ_MODEL]['failures'], 1)
+        self.assertEqual(stats['models'][GROQ_FAST_MODEL]['calls'], 6)
+        # One decision per executed call; the scraper's calls are not repeated
+        reasons = [(d['agent'], d['reason']) for d in stats['decisions']]
+        self.assertEqual(reasons, [
+            ('scraper', 'primary'), ('scraper', 'primary'),
+            ('researcher', 'fallback'), ('researcher', 'rerouted'),
+            ('analyst', 'rerouted'), ('analyst', 'rerouted')
+        ])
+
+    def test_tiered_routing_beats_single_model(self):
+        single = self.run_crew(routing=SINGLE_MODEL_ROUTING)
+        tiered = self.run_crew(routing=MODEL_ROUTING)
+
+        self.assertLess(tiered['metadata']['duration_seconds'], single['metadata']['duration_seconds'])
+        self.assertLess(tiered['model_routing']['total_cost'], single['model_routing']['total_cost'])
+        self.assertEqual(set(single['model_routing']['models']), {GROQ_MODEL})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import os
+import tempfile
+import unittest
+from src.model_router import ModelRouter, is_retryable_error
+
+ROUTING = {
+    'scraper': {
+        'model': 'small',
+        'fallbacks': ['large'],
+        'temperature': 0.3,
+        'max_tokens': 2048,
+        'latency_budget': 2.0
+    },
+    'analyst': {
+        'model': 'large',
+        'fallbacks': ['small'],
+        'temperature': 0.7,
+        'max_tokens': 4096,
+        'latency_budget': 5.0
+    }
+}
+
+PRICING = {
+    'small': {'input': 0.05, 'output': 0.08},
+    'large': {'input': 0.59, 'output': 0.79}
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeLLM:
+    """Local stand-in for the Groq chat completions API"""
+
+    def __init__(self, clock, output_tokens=300, failures=None, latency=0.5):
+        self.clock = clock
+        self.output_tokens = output_tokens
+        self.failures = failures or {}
+        self.latency = latency
+        self.calls = []
+
+    def __call__(self, model, temperature, max_tokens, messages=None):
+        self.calls.append({'model': model, 'temperature': temperature, 'max_tokens': max_tokens})
+        if self.failures.get(model):
+            self.failures[model] -= 1
+            raise RateLimitError('rate limited')
+        tokens = min(self.output_tokens, max_tokens)
+        self.clock.now += self.latency
+        return {
+            'choices': [{'finish_reason': 'length' if tokens == max_tokens else 'stop'}],
+            'usage': {'prompt_tokens': 100, 'completion_tokens': tokens}
+        }
+
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.router = ModelRouter(routing=ROUTING, pricing=PRICING, clock=self.clock)
+
+    def test_complete_uses_agent_route(self):
+        llm = FakeLLM(self.clock)
+
+        self.router.complete('scraper', llm)
+
+        self.assertEqual(llm.calls, [{'model': 'small', 'temperature': 0.3, 'max_tokens': 2048}])
+        stats = self.router.get_stats()
+        self.assertEqual(stats['decisions'][-1]['reason'], 'primary')
+        self.assertEqual(stats['models']['small']['prompt_tokens'], 100)
+        self.assertAlmostEqual(stats['total_cost'], (100 * 0.05 + 300 * 0.08) / 1e6)
+
+    def test_complete_falls_back_on_rate_limit(self):
+        llm = FakeLLM(self.clock, failures={'large': 1})
+
+        self.router.complete('analyst', llm)
+
+        self.assertEqual([call['model'] for call in llm.calls], ['large', 'small'])
+        stats = self.router.get_stats()
+        self.assertEqual(stats['models']['large']['failures'], 1)
+        self.assertEqual(stats['models']['small']['fallbacks'], 1)
+        self.assertEqual(stats['decisions'][-1]['reason'], 'fallback')
+
+        # The rate-limited model stays on cooldown for the next call
+        self.router.complete('analyst', llm)
+        self.assertEqual(self.router.decisions[-1]['reason'], 'rerouted')
+        self.clock.now += 60
+        self.assertEqual(self.router.candidates('analyst'), ['large', 'small'])
+
+    def test_complete_raises_non_retryable_errors(self):
+        def broken(**kwargs):
+            raise ValueError('bad request')
+
+        with self.assertRaises(ValueError):
+            self.router.complete('analyst', broken)
+        self.assertEqual(self.router.model_stats['large']['failures'], 1)
+        self.assertNotIn('small', self.router.model_stats)
+
+    def test_slow_primary_is_rerouted_per_agent(self):
+        self.router.record_success('scraper', 'small', 3.0)
+
+        self.assertEqual(self.router.candidates('scraper'), ['large', 'small'])
+        # Latency seen by one agent does not reroute another
+        self.assertEqual(self.router.candidates('analyst'), ['large', 'small'])
+
+    def test_max_tokens_adapts_to_observed_outputs(self):
+        for tokens in (200, 300, 250):
+            self.assertEqual(self.router.max_tokens('analyst'), 4096)
+            self.router.record_output('analyst', tokens)
+
+        self.assertEqual(self.router.max_tokens('analyst'), 384)
+        self.router.record_output('analyst', 10000)
+        self.assertEqual(self.router.max_tokens('analyst'), 4096)
+
+    def test_truncated_output_restores_configured_limit(self):
+        for tokens in (200, 300, 250):
+            self.router.record_output('analyst', tokens)
+        llm = FakeLLM(self.clock, output_tokens=1000)
+
+        self.router.complete('analyst', llm)
+
+        self.assertEqual(llm.calls[-1]['max_tokens'], 384)
+        self.assertEqual(self.router.max_tokens('analyst'), 4096)
+
+    def test_is_retryable_error(self):
+        self.assertTrue(is_retryable_error(TimeoutError()))
+        self.assertTrue(is_retryable_error(RateLimitError()))
+        self.assertFalse(is_retryable_error(ValueError()))
+
+    def test_start_run_keeps_learned_state(self):
+        self.router.complete('analyst', FakeLLM(self.clock))
+
+        self.router.start_run()
+
+        self.assertEqual(self.router.get_stats()['models'], {})
+        self.assertEqual(self.router.decisions, [])
+        self.assertEqual(self.router.output_tokens, {'analyst': [300]})
+        self.assertEqual(self.router.latency, {'analyst': {'large': 0.5}})
+
+    def test_save_and_load_state(self):
+        self.router.record_success('analyst', 'large', 1.5, 100, 300)
+        for tokens in (200, 300, 250):
+            self.router.record_output('analyst', tokens)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'state.json')
+            self.router.save_state(filename)
+            restored = ModelRouter(routing=ROUTING, pricing=PRICING, clock=self.clock)
+            restored.load_state(filename)
+            restored.load_state(os.path.join(tmp, 'missing.json'))
+
+        self.assertEqual(restored.max_tokens('analyst'), 384)
+        self.assertEqual(restored.latency, {'analyst': {'large': 1.5}})
+        self.assertEqual(restored.model_stats, {})
+
+    def test_decisions_use_wall_clock_timestamps(self):
+        self.clock.now = 5.0
+        self.router.complete('scraper', FakeLLM(self.clock))
+
+        self.assertGreater(self.router.decisions[-1]['timestamp'], 1e9)
+
+if __name__ == '__main__':
+    unittest.main()